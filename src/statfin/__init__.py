@@ -1,10 +1,47 @@
+from statfin.px_file import PxDirectory, load as load_px
 from statfin.px_web_api import PxWebAPI
 from statfin.query import Query
-from statfin.requests import RequestError
+from statfin.query_spec import QuerySpec
+from statfin.requests import (
+    CancellationToken,
+    Cancelled,
+    DeadlineExceeded,
+    RequestError,
+    operation,
+)
+from statfin.selection import Selection, item, all, top, agg, vs
 from statfin.table import Table
 from statfin.variable import Variable, Value
+from statfin.watcher import Watcher, Change
 from statfin import cache
 
+# statfin.all is left out, so that star imports do not shadow the builtin
+__all__ = [
+    "CancellationToken",
+    "Cancelled",
+    "Change",
+    "DeadlineExceeded",
+    "PxDirectory",
+    "PxWebAPI",
+    "Query",
+    "QuerySpec",
+    "RequestError",
+    "Selection",
+    "StatFin",
+    "Table",
+    "Value",
+    "Variable",
+    "Vero",
+    "Watcher",
+    "agg",
+    "cache",
+    "item",
+    "load_px",
+    "operation",
+    "top",
+    "vs",
+]
+
 
 def StatFin(lang: str = "fi") -> PxWebAPI:
     """
@@ -8,6 +8,7 @@ class IndexEntry:
     name: str
     text: str
     typeid: str | None = None
+    updated: str | None = None
 
     def __repr__(self):
         """Representational string"""
@@ -29,4 +30,5 @@ class IndexEntry:
             typeid = j.get("type", None)
             if typeid is not None:
                 typeid = typeid.rstrip()
-            return IndexEntry(name, text, typeid)
+            updated = j.get("updated", None)
+            return IndexEntry(name, text, typeid, updated)
@@ -0,0 +1,270 @@
+from typing import Any
+
+import dataclasses
+import pathlib
+import re
+
+import numpy as np
+import pandas as pd
+
+from statfin.px_web_api import PxWebAPI
+from statfin.selection import Selection
+from statfin.table import Table
+from statfin.table_response import parse_time
+
+
+_CHUNK_SIZE = 1 << 24
+_SEPARATORS = (b" ", b"\t", b"\r", b"\n", b",")
+_WHITESPACE = bytes.maketrans(b"\t\r\n,", b"    ")
+_MISSING = re.compile(rb'"[^"]*"|(?<![^ ])[.-]+(?![^ ])')
+_KEYWORD = re.compile(r"^([A-Za-z0-9_-]+)(?:\[([^\]]+)\])?(?:\((.*)\))?$", re.DOTALL)
+_STATEMENT = re.compile(r'((?:[^";]|"[^"]*")+);')
+_STRING = re.compile(r'"([^"]*)"')
+_CONTINUATION = re.compile(r'"\s*[\r\n]+\s*"')
+
+
+@dataclasses.dataclass
+class PxVariable:
+    code: str
+    text: str
+    codes: list[str]
+    texts: list[str]
+    time: bool = False
+
+
+@dataclasses.dataclass
+class PxHeader:
+    """Metadata part of a PX file"""
+
+    title: str
+    variables: list[PxVariable]
+    content: str | None
+    data_offset: int
+
+    def to_json(self) -> dict:
+        """Format like the table metadata of the PxWeb API"""
+        return {
+            "title": self.title,
+            "variables": [
+                {
+                    "code": v.code,
+                    "text": v.text,
+                    "values": v.codes,
+                    "valueTexts": v.texts,
+                }
+                for v in self.variables
+            ],
+        }
+
+
+class PxDirectory(PxWebAPI):
+    """Directory of PX files, navigable like a PxWeb API"""
+
+    def __init__(self, path: str | pathlib.Path, title: str | None = None):
+        """Interface to the PX files in the given directory"""
+        path = pathlib.Path(path)
+        j = []
+        for child in sorted(path.iterdir()):
+            if child.is_dir():
+                j.append({"id": child.name, "type": "l", "text": child.name})
+            elif child.suffix.lower() == ".px":
+                j.append({"id": child.name, "type": "t", "text": child.stem})
+        super().__init__(str(path), title or path.name, j)
+
+    def _make_cache(self, entry):
+        return load(pathlib.Path(self.url) / entry.name)
+
+
+def load(path: str | pathlib.Path) -> Table | PxDirectory:
+    """
+    Load a local PX file as a table, or a directory of them
+
+    Queries on the table read the data from the file, rather than from an API.
+    """
+    path = pathlib.Path(path)
+    if path.is_dir():
+        return PxDirectory(path)
+    return Table(str(path), read_header(path).to_json())
+
+
+def is_local(url: str) -> bool:
+    """Whether the table URL refers to a local PX file"""
+    return not re.match(r"^https?://", url)
+
+
+def fetch(path: str | pathlib.Path, filters: dict[str, dict]) -> pd.DataFrame:
+    """
+    Query data from a local PX file
+
+    The result has the same shape as the response from the PxWeb API. The
+    data block is streamed, and only the selected cells are kept.
+    """
+    header = read_header(path)
+    positions = [_positions(v, filters.get(v.code)) for v in header.variables]
+    shape = [len(v.codes) for v in header.variables]
+    grid = np.meshgrid(*positions, indexing="ij")
+    index = np.ravel_multi_index(grid, shape).ravel()
+    values = read_data(path, header.data_offset, index)
+    return _build_dataframe(header, positions, values)
+
+
+def read_header(path: str | pathlib.Path) -> PxHeader:
+    """Read the metadata part of a PX file, up to the data block"""
+    lines = []
+    with open(path, "rb") as f:
+        for line in f:
+            i = line.find(b"DATA=")
+            if i >= 0 and not line[:i].strip():
+                lines.append(line[:i])
+                break
+            lines.append(line)
+        else:
+            raise ValueError(f"No data in PX file: {path}")
+    raw = b"".join(lines)
+    data_offset = len(raw) + len(b"DATA=")
+
+    keywords = _parse_keywords(raw.decode(_encoding(raw)))
+    if any(key == "KEYS" for key, _ in keywords):
+        raise ValueError(f"Sparse (KEYS) PX files are not supported: {path}")
+    stub = keywords.get(("STUB", ()), [])
+    heading = keywords.get(("HEADING", ()), [])
+    variables = []
+    for name in [*stub, *heading]:
+        texts = keywords[("VALUES", (name,))]
+        variables.append(
+            PxVariable(
+                code=keywords.get(("VARIABLECODE", (name,)), [name])[0],
+                text=name,
+                codes=keywords.get(("CODES", (name,)), texts),
+                texts=texts,
+                time=("TIMEVAL", (name,)) in keywords,
+            )
+        )
+
+    content = keywords.get(("CONTVARIABLE", ()), [None])[0]
+    for variable in variables:
+        if variable.text == content:
+            content = variable.code
+    title = "".join(keywords.get(("TITLE", ()), [str(path)]))
+    return PxHeader(title, variables, content, data_offset)
+
+
+def read_data(
+    path: str | pathlib.Path, offset: int, index: np.ndarray
+) -> np.ndarray:
+    """
+    Read the cells at the given (sorted) flat indices from the data block
+
+    Missing value markers such as ".." or "-", quoted or not, are read as NaN.
+    """
+    out = np.full(len(index), np.nan)
+    start = 0
+    pos = 0
+    rest = b""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while pos < len(index):
+            chunk = f.read(_CHUNK_SIZE)
+            raw = rest + chunk
+            final = not chunk
+            end = raw.find(b";")
+            if end >= 0:
+                raw = raw[:end]
+                final = True
+            if final:
+                rest = b""
+            else:
+                cut = max(raw.rfind(s) for s in _SEPARATORS)
+                if cut < 0:
+                    rest = raw
+                    continue
+                raw, rest = raw[:cut], raw[cut:]
+
+            try:
+                values = _parse_numbers(raw)
+            except ValueError:
+                raise ValueError(f"Invalid data in PX file {path} after cell {start}")
+            stop = start + len(values)
+            n = pos + np.searchsorted(index[pos:], stop)
+            out[pos:n] = values[index[pos:n] - start]
+            pos = n
+            start = stop
+            if final:
+                break
+    return out
+
+
+def _parse_numbers(raw: bytes) -> np.ndarray:
+    # Missing value markers are only recognized once separators are spaces
+    raw = _MISSING.sub(b"nan", raw.translate(_WHITESPACE))
+    if not raw.strip():
+        return np.zeros(0)
+    return np.fromstring(raw, sep=" ")
+
+
+def _encoding(raw: bytes) -> str:
+    if raw.startswith(b"\xef\xbb\xbf"):
+        return "utf-8-sig"
+    m = re.search(rb'CODEPAGE\s*=\s*"([^"]+)"', raw)
+    return m.group(1).decode("ascii") if m else "iso-8859-1"
+
+
+def _parse_keywords(text: str) -> dict[tuple[str, tuple], Any]:
+    keywords = {}
+    for statement in _statements(text):
+        key, _, value = statement.partition("=")
+        m = _KEYWORD.match(key.strip())
+        if m is None or m.group(2) is not None:
+            continue  # Malformed, or in a secondary language
+        subkeys = tuple(_STRING.findall(m.group(3) or ""))
+        value = _CONTINUATION.sub("", value.strip())
+        if value.startswith('"'):
+            keywords[(m.group(1), subkeys)] = _STRING.findall(value)
+        else:
+            keywords[(m.group(1), subkeys)] = value
+    return keywords
+
+
+def _statements(text: str) -> list[str]:
+    return [s.strip() for s in _STATEMENT.findall(text) if s.strip()]
+
+
+def _positions(variable: PxVariable, j: dict | None) -> np.ndarray:
+    selection = Selection(j["filter"], j["values"]) if j else Selection("all", ["*"])
+    if selection.filter not in ("item", "all", "top"):
+        raise ValueError(f"Filter {selection.filter} is not supported locally")
+    lookup = {code: i for i, code in enumerate(variable.codes)}
+    try:
+        positions = [lookup[c] for c in selection.resolve(variable.codes)]
+    except KeyError as e:
+        raise ValueError(f"No value {e} for variable {variable.code}")
+    return np.array(sorted(positions), dtype=int)
+
+
+def _build_dataframe(
+    header: PxHeader, positions: list[np.ndarray], values: np.ndarray
+) -> pd.DataFrame:
+    shape = [len(p) for p in positions]
+    axes = [i for i, v in enumerate(header.variables) if v.code != header.content]
+
+    values = values.reshape(shape)
+    if len(axes) < len(shape):
+        c = next(i for i in range(len(shape)) if i not in axes)
+        measures = [header.variables[c].codes[p] for p in positions[c]]
+        values = np.moveaxis(values, c, -1)
+    else:
+        measures = ["value"]
+        values = values[..., np.newaxis]
+    values = values.reshape(-1, len(measures))
+
+    data = {}
+    grid = np.meshgrid(*[np.arange(shape[i]) for i in axes], indexing="ij")
+    for i, g in zip(axes, grid):
+        variable = header.variables[i]
+        codes = [variable.codes[p] for p in positions[i]]
+        if variable.time:
+            codes = [parse_time(x) for x in codes]
+        data[variable.code] = pd.Series(codes).take(g.ravel()).reset_index(drop=True)
+    for k, measure in enumerate(measures):
+        data[measure] = values[:, k]
+    return pd.DataFrame(data)
@@ -1,9 +1,10 @@
 import pandas as pd
 
 from statfin import cache
+from statfin import selection
 from statfin.query_response import QueryResponse
-from statfin.requests import post
-from statfin.table_response import TableResponse
+from statfin.query_spec import QuerySpec
+from statfin.requests import CancellationToken, operation
 from statfin.variable import Variable
 
 
@@ -12,7 +13,7 @@ class Query:
         self._table = table
         self._filters = {}
         for variable in self._table.variables:
-            self[variable.code] = variable.codes
+            self[variable.code] = "*"
 
     def __setattr__(self, name, value):
         """Set the filter for the given code"""
@@ -24,26 +25,96 @@ class Query:
     def __setitem__(self, code, spec):
         """Set the filter for the given code"""
         variable = self._find_variable(code)
-        self._filters[code] = variable.to_query_set(spec)
+        self._filters[variable.code] = variable.to_query_set(spec)
 
-    def __call__(self, cache_id: str | None = None) -> QueryResponse:
-        if cache_id is None:
-            return QueryResponse(self._fetch())
+    def __call__(
+        self,
+        cache_id: str | None = None,
+        timeout: float | None = None,
+        token: CancellationToken | None = None,
+    ) -> QueryResponse:
+        """
+        Execute the query
+
+        :param cache_id: cache the results under this name
+        :param timeout: deadline (s) for the whole query
+        :param token: token for cancelling the query from another thread
+        """
+        with operation(timeout, token):
+            if cache_id is None:
+                return QueryResponse(self._fetch())
+            else:
+                return QueryResponse(self._cached_fetch(cache_id))
+
+    def cell_count(self) -> int | None:
+        """Number of cells the query selects, or None if unknown"""
+        count = 1
+        for variable in self._table.variables:
+            n = variable.count(self._filters[variable.code])
+            if n is None:
+                return None
+            count *= n
+        return count
+
+    def spec(self, dtypes: dict[str, str] | None = None) -> QuerySpec:
+        """Self-contained description of the query, for use in other processes"""
+        filters = {code: s.to_json() for code, s in self._filters.items()}
+        return QuerySpec(self._table.url, filters, dtypes)
+
+    def split(
+        self,
+        n: int,
+        code: str | None = None,
+        dtypes: dict[str, str] | None = None,
+    ) -> list[QuerySpec]:
+        """
+        Partition into (at most) n self-contained shards
+
+        The shards split the values of one variable (by default, the one with
+        the most selected values, not counting aggregations and value sets)
+        and can be executed in parallel. Combine the
+        results with QuerySpec.merge().
+        """
+        if code is None:
+            variable = self._largest_variable()
         else:
-            return QueryResponse(self._cached_fetch(cache_id))
+            variable = self._find_variable(code)
+        chosen = self._filters[variable.code]
+        if not chosen.direct:
+            raise ValueError(f"Cannot split on {variable.code}: {chosen.filter}")
+        codes = chosen.resolve(variable.codes)
+        spec = self.spec(dtypes)
+        spec.filters[variable.code] = selection.item(*codes).to_json()
+        return spec.split(n, variable.code)
 
     def _fetch(self) -> pd.DataFrame:
-        return TableResponse(self._fetch_json()).df
+        return self.spec()._fetch()
 
     def _cached_fetch(self, cache_id: str) -> pd.DataFrame:
-        df = cache.load(cache_id, self._filters)
+        fingerprint = self._fingerprint()
+        df = cache.load(cache_id, fingerprint)
         if df is None:
             df = self._fetch()
-            cache.store(cache_id, df, self._filters)
+            cache.store(cache_id, df, fingerprint)
         return df
 
-    def _fetch_json(self) -> dict:
-        return post(self._table.url, json=Query._format_query(self._filters))
+    def _fingerprint(self) -> dict:
+        """
+        Identify the data selected by the filters
+
+        Selections are resolved against the table metadata where possible,
+        so that e.g. top(3) is invalidated once a new period is published.
+        Aggregations and value sets are kept as-is, since their codes are
+        only meaningful together with the filter name.
+        """
+        fingerprint = {}
+        for variable in self._table.variables:
+            chosen = self._filters[variable.code]
+            if chosen.direct:
+                fingerprint[variable.code] = chosen.resolve(variable.codes)
+            else:
+                fingerprint[variable.code] = chosen.to_json()
+        return fingerprint
 
     def _find_variable(self, name) -> Variable:
         candidates = self._find_variable_candidates(name)
@@ -63,12 +134,12 @@ class Query:
                 candidates.append(variable)
         return candidates
 
-    @staticmethod
-    def _format_query(filters: dict) -> dict:
-        return {
-            "response": {"format": "json"},
-            "query": [
-                {"code": code, "selection": {"filter": "item", "values": values}}
-                for code, values in filters.items()
-            ],
-        }
+    def _largest_variable(self) -> Variable:
+        counts = [
+            (variable.count(self._filters[variable.code]), i)
+            for i, variable in enumerate(self._table.variables)
+            if self._filters[variable.code].direct
+        ]
+        if not counts:
+            raise ValueError("No variable to split on")
+        return self._table.variables[max(counts)[1]]
@@ -0,0 +1,115 @@
+import dataclasses
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from statfin.query_response import QueryResponse
+from statfin.requests import CancellationToken, operation, post
+from statfin.table_response import TableResponse
+
+
+@dataclasses.dataclass
+class QuerySpec:
+    """
+    Self-contained description of a query
+
+    Unlike Query, this does not refer to the table metadata, so it can be
+    pickled or passed around as JSON and executed on any worker.
+    """
+
+    url: str
+    filters: dict[str, dict]
+    dtypes: dict[str, str] | None = None
+
+    def __call__(
+        self,
+        timeout: float | None = None,
+        token: CancellationToken | None = None,
+    ) -> QueryResponse:
+        """
+        Execute the query
+
+        :param timeout: deadline (s) for the whole query
+        :param token: token for cancelling the query from another thread
+        """
+        with operation(timeout, token):
+            return QueryResponse(self._fetch())
+
+    def to_json(self) -> dict:
+        """Format as JSON"""
+        return dataclasses.asdict(self)
+
+    @staticmethod
+    def from_json(j: dict):
+        """Parse from JSON"""
+        return QuerySpec(j["url"], j["filters"], j.get("dtypes", None))
+
+    def split(self, n: int, code: str | None = None) -> list["QuerySpec"]:
+        """
+        Partition into (at most) n shards along an item filter
+
+        By default, the item filter with the most values is split.
+        """
+        if code is None:
+            code = self._largest_item_filter()
+        selection = self.filters[code]
+        if selection["filter"] != "item":
+            raise ValueError(f"Cannot split on {code}: not an item filter")
+        values = selection["values"]
+        n = max(1, min(n, len(values)))
+        size = -(-len(values) // n)
+        shards = []
+        for i in range(0, len(values), size):
+            filters = dict(self.filters)
+            filters[code] = {"filter": "item", "values": values[i : i + size]}
+            shards.append(QuerySpec(self.url, filters, self.dtypes))
+        return shards
+
+    @staticmethod
+    def merge(responses: list[QueryResponse]) -> QueryResponse:
+        """
+        Merge the responses to the shards of a split query
+
+        Categorical columns stay categorical, with the union of the categories
+        of each shard.
+        """
+        dfs = [r.df for r in responses]
+        df = pd.concat(dfs, ignore_index=True)
+        for column in df.columns:
+            parts = [d[column] for d in dfs]
+            if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+                df[column] = union_categoricals(parts)
+        return QueryResponse(df)
+
+    def _fetch(self) -> pd.DataFrame:
+        from statfin import px_file
+
+        if px_file.is_local(self.url):
+            df = px_file.fetch(self.url, self.filters)
+        else:
+            df = TableResponse(self._fetch_json()).df
+        if self.dtypes:
+            df = df.astype(self.dtypes)
+        return df
+
+    def _fetch_json(self) -> dict:
+        return post(self.url, json=self._format_query())
+
+    def _format_query(self) -> dict:
+        return {
+            "response": {"format": "json"},
+            "query": [
+                {"code": code, "selection": selection}
+                for code, selection in self.filters.items()
+            ],
+        }
+
+    def _largest_item_filter(self) -> str:
+        candidates = [
+            (len(selection["values"]), code)
+            for code, selection in self.filters.items()
+            if selection["filter"] == "item"
+        ]
+        if not candidates:
+            raise ValueError("No item filter to split on")
+        return max(candidates)[1]
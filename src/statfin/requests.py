@@ -1,4 +1,22 @@
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Iterator
+
+import collections
+import contextlib
+import contextvars
+import dataclasses
+import json
+import threading
+import time
+
 import requests
+from requests.utils import guess_json_utf
+
+
+_timeout = 60.0
+_poll_interval = 0.05
+_min_latency_samples = 10
+_latencies: collections.deque = collections.deque(maxlen=200)
 
 
 class RequestError(Exception):
@@ -8,17 +26,209 @@ class RequestError(Exception):
         self.url = url
 
 
-def get(url, *args, **kwargs):
-    r = requests.get(url, *args, **kwargs, timeout=60)
-    return _as_json(r)
+class DeadlineExceeded(Exception):
+    def __init__(self, url):
+        self.url = url
+
+
+class Cancelled(Exception):
+    def __init__(self, url):
+        self.url = url
+
+
+class CancellationToken:
+    """Flag for aborting in-flight requests from another thread"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        """Abort all requests made under this token"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+@dataclasses.dataclass
+class _Options:
+    deadline: float | None = None
+    tokens: tuple[CancellationToken, ...] = ()
+    hedge: float | None = None
+
+    def check(self, url: str) -> None:
+        if any(token.cancelled for token in self.tokens):
+            raise Cancelled(url)
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise DeadlineExceeded(url)
+
+    def timeout(self, timeout: float, url: str) -> float:
+        if self.deadline is None:
+            return timeout
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(url)
+        return min(timeout, remaining)
+
+
+_options: contextvars.ContextVar[_Options] = contextvars.ContextVar(
+    "statfin_request_options", default=_Options()
+)
 
 
-def post(url, *args, **kwargs):
-    r = requests.post(url, *args, **kwargs, timeout=60)
-    return _as_json(r)
+def set_timeout(seconds: float) -> None:
+    """Set the default timeout for each individual request"""
+    global _timeout
+    _timeout = seconds
 
 
-def _as_json(r):
+@contextlib.contextmanager
+def operation(
+    timeout: float | None = None,
+    token: CancellationToken | None = None,
+    hedge: float | None = None,
+) -> Iterator[None]:
+    """
+    Limit all requests made within the block
+
+    Nested operations are bounded by the enclosing ones.
+
+    :param timeout: deadline (s) for the whole block
+    :param token: token that aborts the requests when cancelled
+    :param hedge: if given, a GET that takes longer than this percentile
+        (e.g. 0.95) of recent GET latencies is duplicated, and the response
+        that arrives first is used
+    """
+    outer = _options.get()
+    deadline = outer.deadline
+    if timeout is not None:
+        deadline = time.monotonic() + timeout
+        if outer.deadline is not None:
+            deadline = min(deadline, outer.deadline)
+    tokens = outer.tokens if token is None else (*outer.tokens, token)
+    hedge = outer.hedge if hedge is None else hedge
+    reset = _options.set(_Options(deadline, tokens, hedge))
+    try:
+        yield
+    finally:
+        _options.reset(reset)
+
+
+def get(url, *args, timeout: float | None = None, **kwargs):
+    return _call("GET", url, timeout, True, args, kwargs)
+
+
+def post(url, *args, timeout: float | None = None, **kwargs):
+    return _call("POST", url, timeout, False, args, kwargs)
+
+
+def _call(method, url, timeout, idempotent, args, kwargs):
+    """
+    Make a request, possibly hedged, within the current operation's limits
+
+    Attempts that are no longer needed (on cancellation, on expiry, or when
+    another attempt wins) are aborted by closing their session and response.
+    An attempt that is still waiting for the response headers cannot be
+    interrupted this way: its thread lingers until the server answers or the
+    per-request timeout expires, but its result is discarded, and the server
+    may still process the request.
+    """
+    options = _options.get()
+    options.check(url)
+    timeout = options.timeout(_timeout if timeout is None else timeout, url)
+    hedge_delay = _hedge_delay(options.hedge) if idempotent else None
+
+    def attempt():
+        abort = threading.Event()
+        aborts.append(abort)
+        return _spawn(
+            _attempt,
+            method,
+            url,
+            timeout,
+            options,
+            abort,
+            handles,
+            idempotent,
+            args,
+            kwargs,
+        )
+
+    aborts: list[threading.Event] = []
+    handles: list = []
+    start = time.monotonic()
+    futures = {attempt()}
+    error = None
+    try:
+        while True:
+            done, futures = wait(futures, _poll_interval, FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if not futures:
+                raise error
+            options.check(url)
+            if len(aborts) == 1 and hedge_delay is not None:
+                if time.monotonic() - start >= hedge_delay:
+                    futures.add(attempt())
+    finally:
+        # Stop the attempts that are still running
+        for abort in aborts:
+            abort.set()
+        for handle in list(handles):
+            try:
+                handle.close()
+            except Exception:
+                pass
+
+
+def _spawn(fn, *args) -> Future:
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def _attempt(method, url, timeout, options, abort, handles, record, args, kwargs):
+    start = time.monotonic()
+    session = requests.Session()
+    handles.append(session)
+    try:
+        r = session.request(method, url, *args, **kwargs, timeout=timeout, stream=True)
+    except requests.Timeout:
+        options.check(url)
+        raise
+    handles.append(r)
+    with r:
+        chunks = []
+        for chunk in r.iter_content(chunk_size=1 << 16):
+            if abort.is_set():
+                raise Cancelled(url)
+            options.check(url)
+            chunks.append(chunk)
+    content = b"".join(chunks)
+    text = content.decode(guess_json_utf(content) or "utf-8", errors="replace")
     if r.status_code != 200:
-        raise RequestError(r.status_code, r.text, r.url)
-    return r.json()
+        raise RequestError(r.status_code, text, r.url)
+    try:
+        j = json.loads(text)
+    except ValueError:
+        raise RequestError(r.status_code, text, r.url)
+    if record and not abort.is_set():
+        _latencies.append(time.monotonic() - start)
+    return j
+
+
+def _hedge_delay(percentile: float | None) -> float | None:
+    if percentile is None or len(_latencies) < _min_latency_samples:
+        return None
+    latencies = sorted(_latencies)
+    return latencies[int(percentile * (len(latencies) - 1))]
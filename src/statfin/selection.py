@@ -0,0 +1,83 @@
+import dataclasses
+import fnmatch
+
+
+@dataclasses.dataclass
+class Selection:
+    """
+    PxWeb selection filter for a single variable
+
+    The filter is one of "item", "all", "top", or a named aggregation or value
+    set ("agg:<name>" or "vs:<name>"). The meaning of the values depends on
+    the filter; see the helper functions in this module.
+    """
+
+    filter: str
+    values: list[str]
+
+    def __repr__(self):
+        """Representational string"""
+        return f"Selection({repr(self.filter)}, {repr(self.values)})"
+
+    @property
+    def direct(self) -> bool:
+        """Whether the filter picks values of the variable itself"""
+        return self.filter in ("item", "all", "top")
+
+    def to_json(self) -> dict:
+        """Format as the "selection" part of a PxWeb query"""
+        return {"filter": self.filter, "values": list(self.values)}
+
+    def resolve(self, codes: list[str]) -> list[str] | None:
+        """
+        Value codes selected out of the given codes
+
+        Returns None if the selection cannot be resolved locally, which is the
+        case for wildcards in aggregations and value sets.
+        """
+        if self.filter == "item":
+            return list(self.values)
+        elif self.filter == "all":
+            return [c for c in codes if _matches_any(c, self.values)]
+        elif self.filter == "top":
+            n = int(self.values[0])
+            return codes[-n:] if n > 0 else []
+        elif any("*" in v for v in self.values):
+            return None
+        else:
+            return list(self.values)
+
+
+def item(*codes) -> Selection:
+    """Select the values with the given codes"""
+    return Selection("item", [str(c) for c in codes])
+
+
+def all(pattern: str = "*") -> Selection:
+    """Select all values whose code matches the (wildcard) pattern"""
+    return Selection("all", [pattern])
+
+
+def top(n: int) -> Selection:
+    """Select the last n values, e.g. the latest n time periods"""
+    n = int(n)
+    if n < 1:
+        raise ValueError(f"Cannot select the top {n} values")
+    return Selection("top", [str(n)])
+
+
+def agg(name: str, *codes) -> Selection:
+    """Select groups from a server-side aggregation (all groups by default)"""
+    return Selection(f"agg:{name}", [str(c) for c in codes] or ["*"])
+
+
+def vs(name: str, *codes) -> Selection:
+    """Select values from a named value set (all values by default)"""
+    return Selection(f"vs:{name}", [str(c) for c in codes] or ["*"])
+
+
+def _matches_any(code: str, patterns: list[str]) -> bool:
+    for pattern in patterns:
+        if fnmatch.fnmatchcase(code, pattern):
+            return True
+    return False
@@ -3,6 +3,9 @@ from typing import Iterable
 import dataclasses
 import re
 
+from statfin import selection
+from statfin.selection import Selection
+
 
 @dataclasses.dataclass
 class Value:
@@ -63,16 +66,26 @@ class Variable:
         prog = re.compile(pattern, flags)
         return [v for v in self.values if prog.search(v.text)]
 
-    def to_query_set(self, query):
-        """List of value codes for the given query spec"""
+    def to_query_set(self, query) -> Selection:
+        """Selection filter for the given query spec"""
         if query == "*" or query is None:
-            return self.codes
+            return selection.all()
+        elif isinstance(query, Selection):
+            if query.filter == "item":
+                assert all(q in self.codes for q in query.values)
+            return query
         elif isinstance(query, str):
             assert query in self.codes
-            return [query]
+            return selection.item(query)
         elif isinstance(query, Iterable):
-            assert [q in self.codes for q in query]
-            return list(query)
+            query = [str(q) for q in query]
+            assert all(q in self.codes for q in query)
+            return selection.item(*query)
         else:
             assert str(query) in self.codes
-            return [str(query)]
+            return selection.item(query)
+
+    def count(self, query: Selection) -> int | None:
+        """Number of values selected, or None if unknown"""
+        codes = query.resolve(self.codes)
+        return None if codes is None else len(codes)
@@ -0,0 +1,201 @@
+from typing import Callable, Iterable
+
+import dataclasses
+import hashlib
+import json
+import os
+import pathlib
+import time
+
+import requests
+
+from statfin.index_entry import IndexEntry
+from statfin.requests import DeadlineExceeded, RequestError, get
+
+
+_TRANSIENT_ERRORS = (RequestError, DeadlineExceeded, requests.RequestException)
+
+
+@dataclasses.dataclass
+class Change:
+    """Change detected in a watched table (new is None if it disappeared)"""
+
+    url: str
+    old: str | None
+    new: str | None
+
+
+@dataclasses.dataclass
+class _Item:
+    url: str
+    names: set[str]
+    hashed: bool = False
+    interval: float = 0.0
+    due: float = 0.0
+
+
+class Watcher:
+    """
+    Detect republished tables by polling the levels that contain them
+
+    A single GET of a level lists the "updated" stamps of all its tables, so
+    watching many tables in a few levels costs a few requests per round. If a
+    level does not report a stamp for a table, the table is instead polled on
+    its own by hashing its metadata.
+    """
+
+    def __init__(
+        self,
+        tables: Iterable,
+        snapshot: str | pathlib.Path | None = None,
+        requests_per_minute: float = 10.0,
+        max_interval: float = 3600.0,
+        on_change: Callable[[Change], None] | None = None,
+    ):
+        """
+        Watch the given tables (Table objects or table URLs)
+
+        :param snapshot: JSON file where the last seen stamps are persisted
+        :param requests_per_minute: request budget that polling is spread over
+        :param max_interval: longest time (s) between polls of a quiet item
+        :param on_change: callback invoked for each detected change
+        """
+        self.snapshot = pathlib.Path(snapshot) if snapshot else None
+        self.requests_per_minute = requests_per_minute
+        self.max_interval = max_interval
+        self.callbacks: list[Callable[[Change], None]] = []
+        if on_change is not None:
+            self.callbacks.append(on_change)
+        self.stamps: dict[str, str] = self._load()
+        self._items: dict[str, _Item] = {}
+        for table in tables:
+            url = table if isinstance(table, str) else table.url
+            level_url, name = url.rsplit("/", 1)
+            item = self._items.setdefault(level_url, _Item(level_url, set()))
+            item.names.add(name)
+
+    @property
+    def min_interval(self) -> float:
+        """Shortest time (s) between polls of an item within the budget"""
+        return len(self._items) * 60.0 / self.requests_per_minute
+
+    def poll(self) -> list[Change]:
+        """
+        Poll the most overdue level (or table) once, with a single request
+
+        Items where changes are seen are polled more often, and quiet ones
+        back off towards max_interval, as do ones whose request fails. Tables
+        seen for the first time are recorded without emitting a change.
+        Tables missing from their level emit a change with new=None, and are
+        no longer watched.
+
+        Delivery is at-least-once: the callbacks run before the new stamps
+        are recorded, so if a callback raises, the change is emitted again on
+        a later poll.
+        """
+        if not self._items:
+            return []
+        item = min(self._items.values(), key=lambda it: it.due)
+        try:
+            found = self._check(item)
+        except _TRANSIENT_ERRORS:
+            self._back_off(item)
+            raise
+        changes = [
+            Change(url, self.stamps.get(url), stamp)
+            for url, stamp in found.items()
+            if stamp is None or self.stamps.get(url, stamp) != stamp
+        ]
+        if changes:
+            item.interval = max(item.interval / 2, self.min_interval)
+            item.due = time.monotonic() + item.interval
+        else:
+            self._back_off(item)
+        for change in changes:
+            for callback in self.callbacks:
+                callback(change)
+        self._record(found)
+        return changes
+
+    def run(self, stop: Callable[[], bool] | None = None) -> None:
+        """
+        Poll continuously within the request budget until stop() is true
+
+        Failed requests are skipped, and the failing item is polled later.
+        """
+        delay = 60.0 / self.requests_per_minute
+        while stop is None or not stop():
+            try:
+                self.poll()
+            except _TRANSIENT_ERRORS:
+                pass
+            due = min((it.due for it in self._items.values()), default=0.0)
+            time.sleep(max(delay, due - time.monotonic()))
+
+    def _back_off(self, item: _Item) -> None:
+        interval = max(item.interval * 2, self.min_interval)
+        item.interval = min(interval, self.max_interval)
+        item.due = time.monotonic() + item.interval
+
+    def _check(self, item: _Item) -> dict[str, str | None]:
+        if item.hashed:
+            return {item.url: _metadata_hash(item.url)}
+        found = {}
+        listed = set()
+        for entry in IndexEntry.from_json(get(item.url)):
+            if entry.name not in item.names:
+                continue
+            listed.add(entry.name)
+            url = f"{item.url}/{entry.name}"
+            if entry.updated:
+                found[url] = entry.updated
+            else:
+                # No stamp: poll the table separately, starting right away
+                item.names.remove(entry.name)
+                self._items[url] = _Item(url, set(), hashed=True)
+        for name in item.names - listed:
+            found[f"{item.url}/{name}"] = None
+        if not item.names:
+            del self._items[item.url]
+        return found
+
+    def _record(self, found: dict[str, str | None]) -> None:
+        dirty = False
+        for url, stamp in found.items():
+            if stamp is None:
+                self._forget(url)
+                if self.stamps.pop(url, None) is not None:
+                    dirty = True
+            elif self.stamps.get(url) != stamp:
+                self.stamps[url] = stamp
+                dirty = True
+        if dirty:
+            self._store()
+
+    def _forget(self, url: str) -> None:
+        level_url, name = url.rsplit("/", 1)
+        item = self._items.get(level_url)
+        if item is not None:
+            item.names.discard(name)
+            if not item.names:
+                del self._items[level_url]
+
+    def _load(self) -> dict[str, str]:
+        if self.snapshot is None or not self.snapshot.is_file():
+            return {}
+        with open(self.snapshot, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _store(self) -> None:
+        if self.snapshot is None:
+            return
+        # Write to a temporary file first, so a crash cannot corrupt the snapshot
+        temp = self.snapshot.with_name(f"{self.snapshot.name}.tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.stamps))
+        os.replace(temp, self.snapshot)
+
+
+def _metadata_hash(url: str) -> str:
+    j = get(url)
+    return hashlib.sha1(json.dumps(j, sort_keys=True).encode("utf-8")).hexdigest()
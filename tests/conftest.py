@@ -0,0 +1,26 @@
+import pytest
+import statfin
+
+
+@pytest.fixture
+def table():
+    return statfin.Table(
+        "https://example.com/api/v1/fi/test.px",
+        {
+            "title": "Test table",
+            "variables": [
+                {
+                    "code": "Alue",
+                    "text": "Alue",
+                    "values": ["SSS", "KU091", "KU092", "MK01"],
+                    "valueTexts": ["KOKO MAA", "Helsinki", "Vantaa", "Uusimaa"],
+                },
+                {
+                    "code": "Vuosi",
+                    "text": "Vuosi",
+                    "values": ["2020", "2021", "2022", "2023"],
+                    "valueTexts": ["2020", "2021", "2022", "2023"],
+                },
+            ],
+        },
+    )
@@ -0,0 +1,132 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+import statfin
+from statfin import px_file
+
+
+PX = """CHARSET="ANSI";
+CODEPAGE="utf-8";
+LANGUAGE="fi";
+LANGUAGES="fi","sv";
+MATRIX="test";
+TITLE="Väestö alueittain";
+CONTVARIABLE="Tiedot";
+STUB="Alue","Vuosi";
+HEADING="Tiedot";
+VARIABLECODE("Alue")="Alue";
+VALUES("Alue")="KOKO MAA","Helsinki",
+"Vantaa";
+VALUES[sv]("Område")="HELA LANDET","Helsingfors","Vanda";
+CODES("Alue")="SSS","KU091","KU092";
+VALUES("Vuosi")="2021","2022";
+TIMEVAL("Vuosi")=TLIST(A1),"2021","2022";
+VALUES("Tiedot")="Väestö","Muutos; %";
+CODES("Tiedot")="vaesto","muutos";
+NOTE="Pitkä ""huomautus"
+"kahdella rivillä";
+DATA=
+5533611 ".." 5563970 0.5
+658457 "." 664028 0.8
+239206 "-" 242819 1.5;
+"""
+
+
+@pytest.fixture
+def px_path(tmp_path):
+    path = tmp_path / "test.px"
+    path.write_text(PX, encoding="utf-8")
+    return path
+
+
+def test_load_table(px_path):
+    tbl = statfin.load_px(px_path)
+    assert isinstance(tbl, statfin.Table)
+    assert tbl.title == "Väestö alueittain"
+    assert [v.code for v in tbl.variables] == ["Alue", "Vuosi", "Tiedot"]
+    assert tbl.Alue.codes == ["SSS", "KU091", "KU092"]
+    assert tbl.Alue.KU092.text == "Vantaa"
+    assert tbl.Tiedot.muutos.text == "Muutos; %"
+
+
+def test_query_all(px_path):
+    df = statfin.load_px(px_path).query()().df
+    assert list(df.columns) == ["Alue", "Vuosi", "vaesto", "muutos"]
+    assert len(df) == 6
+    assert df.iloc[0].Alue == "SSS"
+    assert df.iloc[0].Vuosi == datetime(2021, 1, 1)
+    assert df.iloc[0].vaesto == 5533611
+    assert np.isnan(df.iloc[0].muutos)
+    assert df.iloc[5].Alue == "KU092"
+    assert df.iloc[5].Vuosi == datetime(2022, 1, 1)
+    assert df.iloc[5].muutos == 1.5
+
+
+def test_query_filtered(px_path):
+    q = statfin.load_px(px_path).query(Alue=["KU092", "KU091"], Tiedot="vaesto")
+    q.Vuosi = statfin.top(1)
+    df = q().df
+    assert list(df.columns) == ["Alue", "Vuosi", "vaesto"]
+    assert list(df.Alue) == ["KU091", "KU092"]
+    assert list(df.vaesto) == [664028, 242819]
+
+
+def test_query_spec(px_path):
+    spec = statfin.load_px(px_path).query(Alue="SSS").spec()
+    assert list(spec().df.vaesto) == [5533611, 5563970]
+
+    q = statfin.load_px(px_path).query()
+    q.Alue = statfin.agg("maakunta.agg")
+    with pytest.raises(ValueError):
+        q()
+
+
+def test_streaming(px_path, monkeypatch):
+    monkeypatch.setattr(px_file, "_CHUNK_SIZE", 7)
+    df = statfin.load_px(px_path).query(Tiedot="vaesto")().df
+    assert list(df.vaesto) == [5533611, 5563970, 658457, 664028, 239206, 242819]
+
+
+def test_directory(px_path, tmp_path):
+    (tmp_path / "sub").mkdir()
+    px_path.rename(tmp_path / "sub" / "statfin_test_pxt_001.px")
+
+    db = statfin.load_px(tmp_path)
+    assert isinstance(db, statfin.PxDirectory)
+    assert isinstance(db.sub._001, statfin.Table)
+    assert len(db.sub._001.query(Alue="SSS")().df) == 2
+
+
+def write_px(tmp_path, header, data):
+    path = tmp_path / "small.px"
+    path.write_text(
+        'CODEPAGE="utf-8";\n'
+        'STUB="Alue";\n'
+        'HEADING="Vuosi";\n'
+        'VALUES("Alue")="X","Y";\n'
+        'VALUES("Vuosi")="2020","2021";\n' + header + "DATA=\n" + data + ";\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+def test_sparse_files_rejected(tmp_path):
+    path = write_px(tmp_path, 'KEYS("Alue")=VALUES;\n', '"Y",3,4')
+    with pytest.raises(ValueError):
+        statfin.load_px(path)
+
+
+def test_unquoted_missing_markers(tmp_path):
+    path = write_px(tmp_path, "", "-1 .. - .5")
+    df = statfin.load_px(path).query()().df
+    assert df.value.iloc[0] == -1.0
+    assert np.isnan(df.value.iloc[1])
+    assert np.isnan(df.value.iloc[2])
+    assert df.value.iloc[3] == 0.5
+
+
+def test_invalid_data(tmp_path):
+    path = write_px(tmp_path, "", "1 2 x 4")
+    with pytest.raises(ValueError, match="small.px"):
+        statfin.load_px(path).query()()
@@ -0,0 +1,71 @@
+import json
+import pickle
+
+import pandas as pd
+import pytest
+import statfin
+from statfin.query_response import QueryResponse
+
+
+def test_spec_roundtrip(table):
+    q = table.query(Alue=["SSS", "KU091"])
+    q.Vuosi = statfin.top(2)
+    spec = q.spec(dtypes={"Alue": "category"})
+
+    assert spec.url == "https://example.com/api/v1/fi/test.px"
+    assert pickle.loads(pickle.dumps(spec)) == spec
+    assert statfin.QuerySpec.from_json(json.loads(json.dumps(spec.to_json()))) == spec
+
+
+def test_split_query(table):
+    q = table.query(Vuosi=statfin.top(2))
+    shards = q.split(3)
+
+    # Alue has the most selected values (4), so it is split
+    assert [s.filters["Alue"]["values"] for s in shards] == [
+        ["SSS", "KU091"],
+        ["KU092", "MK01"],
+    ]
+    for shard in shards:
+        assert shard.filters["Vuosi"] == {"filter": "top", "values": ["2"]}
+
+    shards = q.split(2, "Vuosi")
+    assert [s.filters["Vuosi"]["values"] for s in shards] == [["2022"], ["2023"]]
+
+    shards = q.split(2, dtypes={"Alue": "category"})
+    assert all(s.dtypes == {"Alue": "category"} for s in shards)
+
+
+def test_split_skips_aggregations(table):
+    q = table.query()
+    q.Alue = statfin.agg("seutukunta.agg", "SK011", "SK014", "SK015", "SK016", "SK017")
+    shards = q.split(2)
+    assert [s.filters["Vuosi"]["values"] for s in shards] == [
+        ["2020", "2021"],
+        ["2022", "2023"],
+    ]
+    for shard in shards:
+        assert shard.filters["Alue"]["filter"] == "agg:seutukunta.agg"
+
+    with pytest.raises(ValueError):
+        q.split(2, "Alue")
+
+
+def test_merge():
+    responses = [
+        QueryResponse(pd.DataFrame({"Alue": ["SSS"], "x": [1.0]})),
+        QueryResponse(pd.DataFrame({"Alue": ["KU091"], "x": [2.0]})),
+    ]
+    df = statfin.QuerySpec.merge(responses).df
+    assert list(df.Alue) == ["SSS", "KU091"]
+    assert list(df.index) == [0, 1]
+
+
+def test_merge_keeps_categories():
+    responses = [
+        QueryResponse(pd.DataFrame({"Alue": ["SSS"]}).astype("category")),
+        QueryResponse(pd.DataFrame({"Alue": ["KU091"]}).astype("category")),
+    ]
+    df = statfin.QuerySpec.merge(responses).df
+    assert isinstance(df.Alue.dtype, pd.CategoricalDtype)
+    assert set(df.Alue.cat.categories) == {"SSS", "KU091"}
@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pytest
+import statfin
+import statfin.requests
+
+
+class FakeResponse:
+    def __init__(self, content, delay=0.0, status_code=200):
+        self.content = content
+        self.delay = delay
+        self.status_code = status_code
+        self.url = "https://example.com"
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), 4):
+            time.sleep(self.delay)
+            yield self.content[i : i + 4]
+
+
+def fake_get(responses):
+    def request(session, method, url, *args, timeout=None, stream=False, **kwargs):
+        return responses.pop(0)
+
+    return request
+
+
+def test_get_json(monkeypatch):
+    responses = [FakeResponse('{"a": [1, 2]}'.encode("utf-8-sig"))]
+    monkeypatch.setattr(
+        statfin.requests.requests.Session, "request", fake_get(responses)
+    )
+    assert statfin.requests.get("https://example.com") == {"a": [1, 2]}
+
+
+def test_request_error(monkeypatch):
+    responses = [FakeResponse(b"Not found", status_code=404)]
+    monkeypatch.setattr(
+        statfin.requests.requests.Session, "request", fake_get(responses)
+    )
+    with pytest.raises(statfin.RequestError):
+        statfin.requests.get("https://example.com")
+
+
+def test_non_json_body(monkeypatch):
+    responses = [FakeResponse(b"<html>Maintenance break</html>")]
+    monkeypatch.setattr(
+        statfin.requests.requests.Session, "request", fake_get(responses)
+    )
+    with pytest.raises(statfin.RequestError) as e:
+        statfin.requests.get("https://example.com")
+    assert "Maintenance" in e.value.text
+
+
+def test_deadline(monkeypatch):
+    responses = [FakeResponse(b'{"a": 1}' * 10, delay=0.05)]
+    monkeypatch.setattr(
+        statfin.requests.requests.Session, "request", fake_get(responses)
+    )
+    start = time.monotonic()
+    with pytest.raises(statfin.DeadlineExceeded):
+        with statfin.operation(timeout=0.1):
+            statfin.requests.get("https://example.com")
+    assert time.monotonic() - start < 1.0
+
+
+def test_cancellation(monkeypatch):
+    responses = [FakeResponse(b'{"a": 1}' * 10, delay=0.05)]
+    monkeypatch.setattr(
+        statfin.requests.requests.Session, "request", fake_get(responses)
+    )
+    token = statfin.CancellationToken()
+    threading.Timer(0.1, token.cancel).start()
+    with pytest.raises(statfin.Cancelled):
+        with statfin.operation(token=token):
+            statfin.requests.get("https://example.com")
+
+
+def test_hedged_get(monkeypatch):
+    monkeypatch.setattr(statfin.requests, "_latencies", [0.01] * 20)
+    responses = [
+        FakeResponse(b'{"slow": 1}', delay=0.5),
+        FakeResponse(b'{"fast": 1}'),
+    ]
+    monkeypatch.setattr(
+        statfin.requests.requests.Session, "request", fake_get(responses)
+    )
+    start = time.monotonic()
+    with statfin.operation(hedge=0.95):
+        assert statfin.requests.get("https://example.com") == {"fast": 1}
+    assert time.monotonic() - start < 0.5
+
+
+def test_hedge_loser_is_aborted(monkeypatch):
+    latencies = [0.01] * 20
+    monkeypatch.setattr(statfin.requests, "_latencies", latencies)
+    slow = FakeResponse(b'{"slow": 1}' * 50, delay=0.02)
+    chunks = []
+    slow_chunks = slow.iter_content
+
+    def counting_iter_content(chunk_size):
+        for chunk in slow_chunks(chunk_size):
+            chunks.append(chunk)
+            yield chunk
+
+    slow.iter_content = counting_iter_content
+    responses = [slow, FakeResponse(b'{"fast": 1}')]
+    monkeypatch.setattr(
+        statfin.requests.requests.Session, "request", fake_get(responses)
+    )
+    with statfin.operation(hedge=0.95):
+        assert statfin.requests.get("https://example.com") == {"fast": 1}
+    time.sleep(0.2)
+    assert len(chunks) < 20  # Far fewer than the 138 chunks of the response
+    assert len(latencies) == 21  # Only the winner is recorded
+    assert slow.closed
+
+
+def test_expired_deadline(monkeypatch):
+    monkeypatch.setattr(
+        statfin.requests.requests.Session, "request", fake_get([FakeResponse(b"{}")])
+    )
+    monkeypatch.setattr(
+        statfin.requests._Options, "check", lambda self, url: None
+    )  # Let the deadline expire between the check and the timeout
+    with statfin.operation(timeout=0.0):
+        with pytest.raises(statfin.DeadlineExceeded):
+            statfin.requests.get("https://example.com")
+
+
+def test_no_shared_limit(monkeypatch):
+    n = 32
+    barrier = threading.Barrier(n, timeout=5)
+
+    def get(session, method, url, *args, timeout=None, stream=False, **kwargs):
+        barrier.wait()  # Only passes once all requests are in flight
+        return FakeResponse(b"{}")
+
+    monkeypatch.setattr(statfin.requests.requests.Session, "request", get)
+    threads = [
+        threading.Thread(target=statfin.requests.get, args=("https://example.com",))
+        for _ in range(n)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not barrier.broken
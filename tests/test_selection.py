@@ -0,0 +1,79 @@
+import pytest
+import statfin
+
+
+def selections(q):
+    return q.spec().filters
+
+
+def test_default_is_all(table):
+    q = table.query()
+    assert selections(q) == {
+        "Alue": {"filter": "all", "values": ["*"]},
+        "Vuosi": {"filter": "all", "values": ["*"]},
+    }
+    assert q.cell_count() == 16
+
+
+def test_item_specs(table):
+    q = table.query(Alue="SSS")
+    q.Vuosi = [2022, 2023]
+    assert selections(q) == {
+        "Alue": {"filter": "item", "values": ["SSS"]},
+        "Vuosi": {"filter": "item", "values": ["2022", "2023"]},
+    }
+    assert q.cell_count() == 2
+
+
+def test_top_and_wildcard(table):
+    q = table.query()
+    q.Alue = statfin.all("KU*")
+    q.Vuosi = statfin.top(3)
+    assert selections(q) == {
+        "Alue": {"filter": "all", "values": ["KU*"]},
+        "Vuosi": {"filter": "top", "values": ["3"]},
+    }
+    assert q.cell_count() == 6
+    assert q._fingerprint() == {
+        "Alue": ["KU091", "KU092"],
+        "Vuosi": ["2021", "2022", "2023"],
+    }
+
+
+def test_aggregation(table):
+    q = table.query(Vuosi=2023)
+    q.Alue = statfin.agg("seutukunta.agg", "SK011", "SK014")
+    assert selections(q)["Alue"] == {
+        "filter": "agg:seutukunta.agg",
+        "values": ["SK011", "SK014"],
+    }
+    assert q.cell_count() == 2
+    assert q._fingerprint()["Alue"] == {
+        "filter": "agg:seutukunta.agg",
+        "values": ["SK011", "SK014"],
+    }
+
+    q.Alue = statfin.vs("kunnat")
+    assert selections(q)["Alue"] == {"filter": "vs:kunnat", "values": ["*"]}
+    assert q.cell_count() is None
+    assert q._fingerprint()["Alue"] == {"filter": "vs:kunnat", "values": ["*"]}
+
+
+def test_unknown_item_rejected(table):
+    q = table.query()
+    with pytest.raises(AssertionError):
+        q.Alue = "KU999"
+
+
+def test_top_must_be_positive():
+    with pytest.raises(ValueError):
+        statfin.top(0)
+    with pytest.raises(ValueError):
+        statfin.top(-2)
+
+
+def test_star_import_keeps_builtin_all():
+    namespace = {}
+    exec("from statfin import *", namespace)
+    assert "all" not in namespace
+    assert "top" in namespace
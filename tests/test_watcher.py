@@ -0,0 +1,125 @@
+import json
+
+import pytest
+import statfin
+import statfin.watcher
+
+
+LEVEL = "https://example.com/api/v1/fi/StatFin/tyokay"
+
+
+def listing(stamp):
+    return [
+        {"id": "a.px", "type": "t", "text": "A", "updated": stamp},
+        {"id": "b.px", "type": "t", "text": "B", "updated": "2024-01-01T08:00:00"},
+    ]
+
+
+def test_detects_changes(monkeypatch, tmp_path):
+    responses = {LEVEL: listing("2024-01-01T08:00:00")}
+    calls = []
+
+    def fake_get(url):
+        calls.append(url)
+        return responses[url]
+
+    monkeypatch.setattr(statfin.watcher, "get", fake_get)
+
+    seen = []
+    snapshot = tmp_path / "snapshot.json"
+    w = statfin.Watcher(
+        [f"{LEVEL}/a.px", f"{LEVEL}/b.px"], snapshot=snapshot, on_change=seen.append
+    )
+    assert w.poll() == []  # First sighting only records the stamps
+    assert len(calls) == 1  # One request covers both tables
+
+    responses[LEVEL] = listing("2024-02-01T08:00:00")
+    changes = w.poll()
+    assert changes == [
+        statfin.Change(f"{LEVEL}/a.px", "2024-01-01T08:00:00", "2024-02-01T08:00:00")
+    ]
+    assert seen == changes
+
+    with open(snapshot, "r", encoding="utf-8") as f:
+        assert json.load(f)[f"{LEVEL}/a.px"] == "2024-02-01T08:00:00"
+
+    # A new watcher resumes from the persisted snapshot
+    w = statfin.Watcher([f"{LEVEL}/a.px"], snapshot=snapshot)
+    assert w.poll() == []
+
+
+def test_falls_back_to_metadata_hash(monkeypatch):
+    responses = {
+        LEVEL: [{"id": "a.px", "type": "t", "text": "A"}],
+        f"{LEVEL}/a.px": {"title": "A", "variables": []},
+    }
+    calls = []
+
+    def fake_get(url):
+        calls.append(url)
+        return responses[url]
+
+    monkeypatch.setattr(statfin.watcher, "get", fake_get)
+
+    w = statfin.Watcher([f"{LEVEL}/a.px"])
+    assert w.poll() == []  # Finds that the level has no stamps
+    assert w.poll() == []  # Records the first hash
+    responses[f"{LEVEL}/a.px"] = {"title": "A (revised)", "variables": []}
+    assert len(w.poll()) == 1
+
+    # Every poll is a single request, and the level is no longer polled
+    assert calls == [LEVEL, f"{LEVEL}/a.px", f"{LEVEL}/a.px"]
+
+
+def test_no_tables():
+    assert statfin.Watcher([]).poll() == []
+
+
+def test_run_survives_request_errors(monkeypatch):
+    calls = []
+
+    def fake_get(url):
+        calls.append(url)
+        if len(calls) == 1:
+            raise statfin.RequestError(503, "Busy", url)
+        return listing("2024-01-01T08:00:00")
+
+    monkeypatch.setattr(statfin.watcher, "get", fake_get)
+    monkeypatch.setattr(statfin.watcher.time, "sleep", lambda s: None)
+
+    w = statfin.Watcher([f"{LEVEL}/a.px"], requests_per_minute=600)
+    w.run(stop=lambda: len(calls) >= 2)
+    assert w.stamps == {f"{LEVEL}/a.px": "2024-01-01T08:00:00"}
+
+
+def test_missing_table(monkeypatch):
+    monkeypatch.setattr(statfin.watcher, "get", lambda url: listing("x"))
+    w = statfin.Watcher([f"{LEVEL}/a.px", f"{LEVEL}/typo.px"])
+    assert w.poll() == [statfin.Change(f"{LEVEL}/typo.px", None, None)]
+    assert w.poll() == []  # Reported once, then no longer watched
+
+
+def test_callback_errors_are_redelivered(monkeypatch, tmp_path):
+    responses = {LEVEL: listing("2024-01-01T08:00:00")}
+    monkeypatch.setattr(statfin.watcher, "get", lambda url: responses[url])
+
+    failures = [RuntimeError("Callback failed")]
+    seen = []
+
+    def callback(change):
+        if failures:
+            raise failures.pop()
+        seen.append(change)
+
+    snapshot = tmp_path / "snapshot.json"
+    w = statfin.Watcher([f"{LEVEL}/a.px"], snapshot=snapshot, on_change=callback)
+    w.poll()
+    responses[LEVEL] = listing("2024-02-01T08:00:00")
+    with pytest.raises(RuntimeError):
+        w.poll()
+
+    # The change was not recorded, so a restarted watcher emits it again
+    w = statfin.Watcher([f"{LEVEL}/a.px"], snapshot=snapshot, on_change=callback)
+    assert len(w.poll()) == 1
+    assert len(seen) == 1
+    assert not (tmp_path / "snapshot.json.tmp").exists()